@@ -1,12 +1,33 @@
 """
 Configuration settings for Vertex AI Search RAG API
-Loads environment variables using Pydantic Settings
+Loads environment variables from the process environment (plus .env for local dev)
 """
 
-from pydantic_settings import BaseSettings, SettingsConfigDict
+import os
+from dataclasses import dataclass
+from functools import lru_cache
 
 
-class Settings(BaseSettings):
+def _load_dotenv(path: str = ".env") -> None:
+    """
+    Minimal .env loader - variables already in the environment always win
+
+    For a handful of flat string keys a line-by-line parse replaces the
+    pydantic-settings / python-dotenv machinery (and its import cost).
+    """
+    if not os.path.isfile(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, _, value = line.partition("=")
+            os.environ.setdefault(key.strip(), value.strip().strip('"').strip("'"))
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
     """
     Application settings loaded from environment variables
 
@@ -18,15 +39,10 @@ class Settings(BaseSettings):
 
     Optional variables:
     - VERTEX_SEARCH_LOCATION: Vertex AI Search location (default: "global")
+    - FEEDBACK_BUCKET_NAME: GCS bucket for feedback logging
+    - DEBUG: enable verbose diagnostics ("1"/"true", default off)
     """
 
-    model_config = SettingsConfigDict(
-        env_file=".env",
-        env_file_encoding="utf-8",
-        case_sensitive=True,
-        extra="ignore",  # Ignore extra environment variables
-    )
-
     # Gemini AI Configuration
     GEMINI_API_KEY: str
 
@@ -36,32 +52,27 @@ class Settings(BaseSettings):
     VERTEX_SEARCH_ENGINE_ID: str
     VERTEX_SEARCH_LOCATION: str = "global"
 
-    # Properties for backward compatibility and cleaner access
-    @property
-    def gcp_project_id(self) -> str:
-        return self.GCP_PROJECT_ID
-
-    @property
-    def gcp_service_account_key(self) -> str:
-        return self.GCP_SERVICE_ACCOUNT_KEY
+    # Google Cloud Storage (feedback logging)
+    FEEDBACK_BUCKET_NAME: str = "9expert-feedback-storage"
 
-    @property
-    def vertex_search_engine_id(self) -> str:
-        return self.VERTEX_SEARCH_ENGINE_ID
+    # Proactive Vertex/Gemini throttling - sustained requests per second
+    # (0 = unthrottled, the default) and max concurrent upstream calls
+    VERTEX_MAX_QPS: float = 0.0
+    VERTEX_MAX_CONCURRENCY: int = 32
 
-    @property
-    def vertex_search_location(self) -> str:
-        return self.VERTEX_SEARCH_LOCATION
+    # Feedback batching - events per NDJSON batch object (0 = one object
+    # per event, the default) and max seconds before a partial batch flushes
+    FEEDBACK_BATCH_SIZE: int = 0
+    FEEDBACK_FLUSH_INTERVAL: float = 5.0
 
-    @property
-    def gemini_api_key(self) -> str:
-        return self.GEMINI_API_KEY
+    # Debug mode - enables verbose diagnostics (never on in production)
+    DEBUG: bool = False
 
     # Allowed Gemini models for streaming mode
-    allowed_models: list[str] = [
+    allowed_models: tuple[str, ...] = (
         "gemini-2.0-flash",
         "gemini-2.5-flash",
-    ]
+    )
 
     # API metadata
     api_title: str = "Vertex AI Search RAG API"
@@ -69,5 +80,46 @@ class Settings(BaseSettings):
     api_description: str = "Standalone Vertex AI Search with RAG and Gemini streaming"
 
 
+_REQUIRED_VARS = (
+    "GEMINI_API_KEY",
+    "GCP_PROJECT_ID",
+    "GCP_SERVICE_ACCOUNT_KEY",
+    "VERTEX_SEARCH_ENGINE_ID",
+)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Build the Settings singleton exactly once per process
+
+    Reads .env only when present (local dev); in containers the variables
+    are already in os.environ and no file IO happens at all.
+    """
+    _load_dotenv()
+
+    missing = [key for key in _REQUIRED_VARS if key not in os.environ]
+    if missing:
+        raise ValueError(
+            f"Missing required environment variables: {', '.join(missing)}"
+        )
+
+    return Settings(
+        GEMINI_API_KEY=os.environ["GEMINI_API_KEY"],
+        GCP_PROJECT_ID=os.environ["GCP_PROJECT_ID"],
+        GCP_SERVICE_ACCOUNT_KEY=os.environ["GCP_SERVICE_ACCOUNT_KEY"],
+        VERTEX_SEARCH_ENGINE_ID=os.environ["VERTEX_SEARCH_ENGINE_ID"],
+        VERTEX_SEARCH_LOCATION=os.environ.get("VERTEX_SEARCH_LOCATION", "global"),
+        FEEDBACK_BUCKET_NAME=os.environ.get(
+            "FEEDBACK_BUCKET_NAME", "9expert-feedback-storage"
+        ),
+        DEBUG=os.environ.get("DEBUG", "").lower() in ("1", "true", "yes"),
+        VERTEX_MAX_QPS=float(os.environ.get("VERTEX_MAX_QPS", "0")),
+        VERTEX_MAX_CONCURRENCY=int(os.environ.get("VERTEX_MAX_CONCURRENCY", "32")),
+        FEEDBACK_BATCH_SIZE=int(os.environ.get("FEEDBACK_BATCH_SIZE", "0")),
+        FEEDBACK_FLUSH_INTERVAL=float(os.environ.get("FEEDBACK_FLUSH_INTERVAL", "5.0")),
+    )
+
+
 # Initialize settings instance (singleton)
-settings = Settings()
+settings = get_settings()
@@ -3,47 +3,94 @@ Vertex AI Search RAG API - Main FastAPI application
 Standalone service for Vertex AI Search with RAG and Gemini streaming
 """
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import orjson
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from app.config import settings
-from app.routers import vertex_search, feedback
 
-# Run with: uvicorn app.main:app --reload --port 8000
+logger = logging.getLogger(__name__)
+
+# Run with: uvicorn app.main:app --loop uvloop --http httptools --port 8000
+# (add --reload for development; uvloop/httptools ship with uvicorn[standard])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Lifespan context - defers router imports off the import-time critical path
+
+    Importing the routers pulls in the Google Cloud SDKs, the Gemini client
+    and all Pydantic model compilation. Doing it here lets uvicorn bind its
+    socket first, cutting cold-start latency on serverless deployments.
+    """
+    from app.routers import vertex_search, feedback
+
+    # Register Vertex Search router
+    app.include_router(vertex_search.router, prefix="/api", tags=["vertex-search"])
+
+    # Register Feedback router
+    app.include_router(feedback.router, prefix="/api", tags=["feedback"])
+
+    # Warm the GCS feedback singleton in the background so the first
+    # request doesn't block on credential parsing + client construction
+    async def _warm_feedback_service():
+        try:
+            await asyncio.to_thread(feedback.get_feedback_service)
+        except Exception as e:
+            logger.warning("Feedback service warmup failed (will retry on first request): %s", e)
+
+    app.state.feedback_warmup = asyncio.create_task(_warm_feedback_service())
+
+    yield
+
+    # Shutdown: drain the Vertex service's pooled HTTP client, if it was built
+    if vertex_search._vertex_service_instance is not None:
+        await vertex_search._vertex_service_instance.aclose()
+
+    # ... and flush any batched feedback that's been acked but not yet
+    # uploaded (the singleton is memoized with functools.cache, so only
+    # close it if something actually constructed it)
+    if feedback.get_feedback_service.cache_info().currsize:
+        await feedback.get_feedback_service().aclose()
+
 
 app = FastAPI(
     title=settings.api_title,
     version=settings.api_version,
     description=settings.api_description,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # Rust-side JSON encoding app-wide
 )
 
 # Add CORS middleware for cross-origin requests
 # Allows requests from:
-# - Localhost (development)
-# - Vercel deployments (production)
-# - Any custom domains (if needed later)
+# - Localhost (development) - exact origins, matched via O(1) set membership
+# - Vercel deployments and 9expert domains - anchored regex for the wildcard
+#   subdomains only, so non-matches are rejected within the first few chars
 app.add_middleware(
     CORSMiddleware,
-    allow_origin_regex=r"https://.*\.vercel\.app|http://localhost:3000|http://127\.0\.0\.1:3000|https://.*\.9expert\.com",
+    allow_origins=[
+        "http://localhost:3000",
+        "http://127.0.0.1:3000",
+    ],
+    allow_origin_regex=r"https://([^.]+\.)?(vercel\.app|9expert\.com)$",
     allow_credentials=False,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
     expose_headers=["*"],
 )
 
-# Register Vertex Search router
-app.include_router(vertex_search.router, prefix="/api", tags=["vertex-search"])
-
-# Register Feedback router
-app.include_router(feedback.router, prefix="/api", tags=["feedback"])
 
-
-@app.get("/")
-async def root():
-    """
-    Health check endpoint
-    Returns API status and service information
-    """
-    return {
+# Pre-built responses for the health endpoints - both bodies are pure
+# functions of startup-time constants, and liveness probes hit these at
+# high frequency, so encode once and reuse the Response objects
+_ROOT_RESPONSE = Response(
+    content=orjson.dumps({
         "status": "ok",
         "service": settings.api_title,
         "version": settings.api_version,
@@ -53,7 +100,26 @@ async def root():
             "docs": "/docs",
             "redoc": "/redoc"
         }
-    }
+    }),
+    media_type="application/json"
+)
+
+_HEALTH_RESPONSE = Response(
+    content=orjson.dumps({
+        "status": "healthy",
+        "service": settings.api_title
+    }),
+    media_type="application/json"
+)
+
+
+@app.get("/")
+async def root():
+    """
+    Health check endpoint
+    Returns API status and service information
+    """
+    return _ROOT_RESPONSE
 
 
 @app.get("/health")
@@ -61,7 +127,11 @@ async def health_check():
     """
     Health check endpoint for monitoring
     """
-    return {
-        "status": "healthy",
-        "service": settings.api_title
-    }
+    return _HEALTH_RESPONSE
+
+
+if __name__ == "__main__":
+    # Programmatic fallback with the fast event loop / HTTP parser pinned
+    import uvicorn
+
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
@@ -3,10 +3,21 @@ Pydantic models for Feedback API
 Handles user feedback on AI responses (thumbs up/down with optional reason)
 """
 
-from typing import Optional, Literal
-from pydantic import BaseModel, Field
+from typing import Annotated, Optional
+from pydantic import AfterValidator, BaseModel
 from datetime import datetime
 
+from app.models.vertex_search import F
+
+# O(1) membership check instead of Pydantic's linear Literal scan
+_FEEDBACK_TYPES = frozenset({"up", "down"})
+
+
+def _check_feedback_type(value: str) -> str:
+    if value not in _FEEDBACK_TYPES:
+        raise ValueError(f"must be one of {sorted(_FEEDBACK_TYPES)}")
+    return value
+
 
 class FeedbackRequest(BaseModel):
     """
@@ -14,32 +25,32 @@ class FeedbackRequest(BaseModel):
     Sent from frontend when user provides feedback on AI response
     """
 
-    messageId: str = Field(
+    messageId: str = F(
         ...,
         description="Unique message ID from chat session",
         min_length=1,
         max_length=200
     )
 
-    feedback: Literal["up", "down"] = Field(
+    feedback: Annotated[str, AfterValidator(_check_feedback_type)] = F(
         ...,
         description="Feedback type: thumbs up or down"
     )
 
-    reason: Optional[str] = Field(
+    reason: Optional[str] = F(
         None,
         description="Optional reason for thumbs down (max 500 chars)",
         max_length=500
     )
 
-    userQuestion: str = Field(
+    userQuestion: str = F(
         ...,
         description="User's original question that triggered the AI response",
         min_length=1,
         max_length=1000
     )
 
-    aiAnswer: str = Field(
+    aiAnswer: str = F(
         ...,
         description="Complete AI response that user is giving feedback on",
         min_length=1,
@@ -52,21 +63,21 @@ class FeedbackResponse(BaseModel):
     Response after successfully logging feedback to GCS
     """
 
-    success: bool = Field(..., description="Whether feedback was logged successfully")
+    success: bool = F(..., description="Whether feedback was logged successfully")
 
-    message: str = Field(..., description="Human-readable status message")
+    message: str = F(..., description="Human-readable status message")
 
-    feedbackId: Optional[str] = Field(
+    feedbackId: Optional[str] = F(
         None,
         description="Unique ID for this feedback entry (filename in GCS)"
     )
 
-    storedAt: Optional[str] = Field(
+    storedAt: Optional[str] = F(
         None,
         description="ISO timestamp when feedback was stored"
     )
 
-    error: Optional[str] = Field(
+    error: Optional[str] = F(
         None,
         description="Error message if success=False"
     )
@@ -3,49 +3,80 @@ Pydantic models for Vertex AI Search API
 Equivalent to app/types/vertex-search.ts in Nuxt frontend
 """
 
-from typing import Optional, Literal
-from pydantic import BaseModel, Field
+from typing import Annotated, Optional, Literal
+from typing_extensions import TypedDict
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field
+
+from app.config import settings
+
+# Allowed values for constrained request fields - frozenset membership is an
+# O(1) C-level check, where Pydantic's Literal path scans the values linearly
+_MODES = frozenset({"streaming", "direct"})
+_QUERY_EXPANSION_MODES = frozenset({"AUTO", "DISABLED", "ALWAYS"})
+_SPELL_CORRECTION_MODES = frozenset({"AUTO", "DISABLED", "SUGGESTION_ONLY"})
+_RELEVANCE_THRESHOLDS = frozenset({"LOWEST", "LOW", "MEDIUM", "HIGH", "HIGHEST"})
+_SUMMARY_MODEL_VERSIONS = frozenset({"stable", "preview"})
+
+
+def F(default=..., **kwargs):
+    """
+    Field wrapper that drops description strings outside DEBUG
+
+    Descriptions only serve /docs; in production they bloat the core/JSON
+    schema built at import and sit resident in memory for no reader.
+    """
+    if not settings.DEBUG:
+        kwargs.pop("description", None)
+    return Field(default, **kwargs)
+
+
+def _one_of(allowed: frozenset):
+    """Build an AfterValidator check against a frozenset of allowed values"""
+    def check(value: str) -> str:
+        if value not in allowed:
+            raise ValueError(f"must be one of {sorted(allowed)}")
+        return value
+    return check
 
 
 # ============================================================================
 # Configuration Sub-Models
 # ============================================================================
+# These sub-objects are forwarded verbatim to the Vertex AI REST API, so they
+# are TypedDicts rather than nested BaseModels: Pydantic does a thin shape
+# check instead of building (and running) a full core schema per sub-model.
 
-class ConditionBoostSpec(BaseModel):
+class ConditionBoostSpec(TypedDict):
     """Boost specification based on filter condition"""
-    condition: str = Field(..., description="Filter expression (e.g., 'rating >= 4.5')")
-    boost: float = Field(..., description="Boost amount (-1 to 1)", ge=-1.0, le=1.0)
+    condition: str  # Filter expression (e.g., 'rating >= 4.5')
+    boost: float  # Boost amount (-1 to 1)
 
 
-class FreshnessBoostSpec(BaseModel):
+class FreshnessBoostSpec(TypedDict):
     """Boost specification based on datetime freshness"""
-    datetimeField: str = Field(..., description="Datetime field name (e.g., 'published_date')")
-    freshnessDuration: str = Field(..., description="Duration (e.g., '30d' for 30 days)")
-    boost: float = Field(..., description="Boost amount (-1 to 1)", ge=-1.0, le=1.0)
+    datetimeField: str  # Datetime field name (e.g., 'published_date')
+    freshnessDuration: str  # Duration (e.g., '30d' for 30 days)
+    boost: float  # Boost amount (-1 to 1)
 
 
-class BoostSpec(BaseModel):
+class BoostSpec(TypedDict, total=False):
     """Result boosting configuration"""
-    conditionBoostSpecs: Optional[list[ConditionBoostSpec]] = Field(
-        None, description="Condition-based boosts"
-    )
-    freshnessBoostSpecs: Optional[list[FreshnessBoostSpec]] = Field(
-        None, description="Freshness-based boosts"
-    )
+    conditionBoostSpecs: list[ConditionBoostSpec]
+    freshnessBoostSpecs: list[FreshnessBoostSpec]
 
 
-class FacetKey(BaseModel):
+class FacetKey(TypedDict, total=False):
     """Facet key configuration"""
-    key: str = Field(..., description="Field name for faceting")
-    restrictedValues: Optional[list[str]] = Field(None, description="Limit to specific values")
+    key: str  # Field name for faceting
+    restrictedValues: list[str]  # Limit to specific values
 
 
-class FacetSpec(BaseModel):
+class FacetSpec(TypedDict, total=False):
     """Faceted search specification"""
     facetKey: FacetKey
-    limit: Optional[int] = Field(20, description="Max facet values to return", ge=1, le=100)
-    excludedFilterKeys: Optional[list[str]] = Field(None, description="Filter keys to exclude")
-    enableDynamicPosition: Optional[bool] = Field(True, description="Enable dynamic positioning")
+    limit: int  # Max facet values to return
+    excludedFilterKeys: list[str]  # Filter keys to exclude
+    enableDynamicPosition: bool  # Enable dynamic positioning
 
 
 # ============================================================================
@@ -56,88 +87,88 @@ class VertexSearchRequest(BaseModel):
     """Request body for Vertex AI Search endpoint - ENHANCED with all major features"""
 
     # Core search parameters
-    query: str = Field(..., description="Search query", min_length=1, max_length=500)
-    mode: Literal["streaming", "direct"] = Field(
+    query: str = F(..., description="Search query", min_length=1, max_length=500)
+    mode: Annotated[str, AfterValidator(_one_of(_MODES))] = F(
         default="streaming",
         description="Response mode: streaming (RAG→Gemini) or direct (Vertex summary)"
     )
-    pageSize: Optional[int] = Field(
+    pageSize: Optional[int] = F(
         default=5,
         description="Number of search results",
         ge=1,
         le=50  # Increased from 10 to 50 based on docs
     )
-    model: Optional[str] = Field(
+    model: Optional[str] = F(
         default="gemini-2.0-flash",
         description="Gemini model for streaming mode"
     )
 
     # Query enhancement
-    queryExpansion: Optional[Literal["AUTO", "DISABLED", "ALWAYS"]] = Field(
+    queryExpansion: Optional[Annotated[str, AfterValidator(_one_of(_QUERY_EXPANSION_MODES))]] = F(
         default="AUTO",
         description="Query expansion mode"
     )
-    spellCorrection: Optional[Literal["AUTO", "DISABLED", "SUGGESTION_ONLY"]] = Field(
+    spellCorrection: Optional[Annotated[str, AfterValidator(_one_of(_SPELL_CORRECTION_MODES))]] = F(
         default="AUTO",
         description="Spell correction mode"
     )
 
     # Filtering
-    filter: Optional[str] = Field(
+    filter: Optional[str] = F(
         None,
         description="Filter expression (e.g., 'category: ANY(\"course\") AND price < 5000')"
     )
-    canonicalFilter: Optional[str] = Field(
+    canonicalFilter: Optional[str] = F(
         None,
         description="Default filter applied with query expansion"
     )
 
     # Boosting
-    boostSpec: Optional[BoostSpec] = Field(
+    boostSpec: Optional[BoostSpec] = F(
         None,
         description="Result boosting configuration"
     )
 
     # Faceted search
-    facetSpecs: Optional[list[FacetSpec]] = Field(
+    facetSpecs: Optional[list[FacetSpec]] = F(
         None,
         description="Facet specifications (max 100)",
         max_length=100
     )
 
     # Relevance controls
-    relevanceThreshold: Optional[Literal["LOWEST", "LOW", "MEDIUM", "HIGH", "HIGHEST"]] = Field(
+    relevanceThreshold: Optional[Annotated[str, AfterValidator(_one_of(_RELEVANCE_THRESHOLDS))]] = F(
         None,
         description="Minimum relevance threshold for results"
     )
 
     # Summary customization (direct mode)
-    customSystemPrompt: Optional[str] = Field(
+    customSystemPrompt: Optional[str] = F(
         None,
         description="Custom system prompt for AI summary (direct mode only)",
         max_length=2000
     )
-    useSemanticChunks: Optional[bool] = Field(
+    useSemanticChunks: Optional[bool] = F(
         True,
         description="Use semantic chunking for better quality (direct mode)"
     )
-    summaryResultCount: Optional[int] = Field(
+    summaryResultCount: Optional[int] = F(
         5,
         description="Number of results to use for summary",
         ge=1,
         le=10
     )
-    languageCode: Optional[str] = Field(
+    languageCode: Optional[str] = F(
         "th",
         description="BCP-47 language code for responses (e.g., 'th', 'en')"
     )
 
     # Advanced options
-    returnRelevanceScore: Optional[bool] = Field(
+    returnRelevanceScore: Optional[bool] = F(
         False,
         description="Include relevance scores in response"
     )
-    safeSearch: Optional[bool] = Field(
+    safeSearch: Optional[bool] = F(
         False,
         description="Enable safe search filtering"
     )
@@ -145,25 +176,25 @@ class VertexSearchRequest(BaseModel):
     # ========================================================================
     # MODEL GENERATION PARAMETERS (Streaming mode - Gemini)
     # ========================================================================
-    temperature: Optional[float] = Field(
+    temperature: Optional[float] = F(
         None,
         description="Sampling temperature (0.0-2.0). Higher = more creative. Streaming mode only.",
         ge=0.0,
         le=2.0
     )
-    topK: Optional[int] = Field(
+    topK: Optional[int] = F(
         None,
         description="Top-K sampling (1-40). Limits to top K tokens. Streaming mode only.",
         ge=1,
         le=40
     )
-    topP: Optional[float] = Field(
+    topP: Optional[float] = F(
         None,
         description="Top-P nucleus sampling (0.0-1.0). Cumulative probability threshold. Streaming mode only.",
         ge=0.0,
         le=1.0
     )
-    maxOutputTokens: Optional[int] = Field(
+    maxOutputTokens: Optional[int] = F(
         None,
         description="Maximum output tokens (1-8192). Controls response length. Streaming mode only.",
         ge=1,
@@ -173,7 +204,7 @@ class VertexSearchRequest(BaseModel):
     # ========================================================================
     # SUMMARY MODEL CONTROL (Direct mode - Vertex AI)
     # ========================================================================
-    summaryModelVersion: Optional[Literal["stable", "preview"]] = Field(
+    summaryModelVersion: Optional[Annotated[str, AfterValidator(_one_of(_SUMMARY_MODEL_VERSIONS))]] = F(
         "stable",
         description="Vertex AI summary model version. 'stable' = production, 'preview' = latest. Direct mode only."
     )
@@ -185,31 +216,39 @@ class VertexSearchRequest(BaseModel):
 
 class FormattedCitation(BaseModel):
     """Citation with source information - client-ready format"""
-    id: Optional[str] = Field(None, description="Citation ID for tracking")
-    title: str = Field(..., description="Human-readable source title")
-    source_type: Optional[str] = Field(None, description="Type: faq, course, about, etc.")
-    url: Optional[str] = Field(None, description="Public URL if available (not gs://)")
-    snippet: Optional[str] = Field(None, description="Clean text preview (max 200 chars)")
-    relevance_score: Optional[float] = Field(None, description="Relevance score 0-1", ge=0, le=1)
+    model_config = ConfigDict(frozen=True, extra='forbid', validate_assignment=False)
+
+    id: Optional[str] = F(None, description="Citation ID for tracking")
+    title: str = F(..., description="Human-readable source title")
+    source_type: Optional[str] = F(None, description="Type: faq, course, about, etc.")
+    url: Optional[str] = F(None, description="Public URL if available (not gs://)")
+    snippet: Optional[str] = F(None, description="Clean text preview (max 200 chars)")
+    relevance_score: Optional[float] = F(None, description="Relevance score 0-1", ge=0, le=1)
 
     # Keep original URI for debugging (not shown to end users)
-    internal_uri: Optional[str] = Field(None, alias="uri", exclude=True)
+    internal_uri: Optional[str] = F(None, alias="uri", exclude=True)
 
 
 class FacetValue(BaseModel):
     """Facet value with count"""
+    model_config = ConfigDict(frozen=True, extra='forbid', validate_assignment=False)
+
     value: str
     count: int
 
 
 class Facet(BaseModel):
     """Facet result with values and counts"""
+    model_config = ConfigDict(frozen=True, extra='forbid', validate_assignment=False)
+
     key: str
     values: list[FacetValue]
 
 
 class FormattedSearchResponse(BaseModel):
     """Formatted response for frontend"""
+    model_config = ConfigDict(frozen=True, extra='forbid', validate_assignment=False)
+
     success: bool
     mode: Literal["streaming", "direct"]
     query: str
@@ -227,6 +266,8 @@ class FormattedSearchResponse(BaseModel):
 
 class StreamChunk(BaseModel):
     """Single chunk in Server-Sent Events stream"""
+    model_config = ConfigDict(frozen=True, extra='forbid', validate_assignment=False)
+
     chunk: str
     done: bool
     citations: Optional[list[FormattedCitation]] = None
@@ -3,41 +3,52 @@ Feedback Router - Provides POST /api/feedback endpoint
 Handles user feedback on AI responses (thumbs up/down with optional reason)
 """
 
+import logging
+from functools import cache
+
+import orjson
 from fastapi import APIRouter, HTTPException, Depends
-from app.models.feedback import FeedbackRequest, FeedbackResponse
+from fastapi.responses import Response
+from app.models.feedback import FeedbackRequest
 from app.services.gcs_feedback_service import GCSFeedbackService
 from app.config import settings
 
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Singleton instance - reuse GCS client across requests
-_feedback_service_instance: GCSFeedbackService | None = None
+router = APIRouter()
 
+# Pre-encoded prefix of the success payload - the Thai thank-you message is
+# constant, so only feedbackId/storedAt need serializing per request
+_SUCCESS_PREFIX = orjson.dumps({
+    "success": True,
+    "message": "ขอบคุณสำหรับคำติชมครับ! เราจะนำไปปรับปรุง AI ให้ดีขึ้น",
+    "error": None,
+})[:-1] + b","
 
+@cache
 def get_feedback_service() -> GCSFeedbackService:
     """
     Dependency: Get or create GCS feedback service singleton instance
 
-    Uses singleton pattern to:
-    - Reuse GCS credentials across requests
-    - Avoid redundant service account parsing
-    - Maintain connection pool
+    functools.cache memoizes the instance, so after the first call the
+    dependency resolves through a single C-level dict lookup instead of a
+    global + None-check per request. Keeps one set of GCS credentials and
+    one connection pool for the whole process.
     """
-    global _feedback_service_instance
-
-    if _feedback_service_instance is None:
-        print("[Service] Initializing GCSFeedbackService singleton...")
-        _feedback_service_instance = GCSFeedbackService(
-            gcp_service_account_key=settings.gcp_service_account_key,
-            gcp_project_id=settings.gcp_project_id,
-            feedback_bucket_name="9expert-feedback-storage"  # TODO: Move to config
-        )
-
-    return _feedback_service_instance
-
-
-@router.post("/feedback", response_model=FeedbackResponse)
+    logger.info("Initializing GCSFeedbackService singleton...")
+    return GCSFeedbackService(
+        gcp_service_account_key=settings.GCP_SERVICE_ACCOUNT_KEY,
+        gcp_project_id=settings.GCP_PROJECT_ID,
+        feedback_bucket_name=settings.FEEDBACK_BUCKET_NAME,
+        batch_size=settings.FEEDBACK_BATCH_SIZE,
+        flush_interval=settings.FEEDBACK_FLUSH_INTERVAL
+    )
+
+
+# No response_model: the success body is pre-encoded bytes (see above) and
+# re-validating our own known-valid payload would cost a Pydantic walk per call
+@router.post("/feedback")
 async def submit_feedback(
     feedback: FeedbackRequest,
     feedback_service: GCSFeedbackService = Depends(get_feedback_service)
@@ -69,17 +80,20 @@ async def submit_feedback(
         result = await feedback_service.log_feedback(feedback)
 
         if result["success"]:
-            return FeedbackResponse(
-                success=True,
-                message="ขอบคุณสำหรับคำติชมครับ! เราจะนำไปปรับปรุง AI ให้ดีขึ้น",
-                feedbackId=result["feedbackId"],
-                storedAt=result["storedAt"],
-                error=None
+            # Splice the variable fields onto the pre-encoded prefix, skipping
+            # Pydantic model construction + serialization on the hot path
+            variable_part = orjson.dumps({
+                "feedbackId": result["feedbackId"],
+                "storedAt": result["storedAt"],
+            })
+            return Response(
+                content=_SUCCESS_PREFIX + variable_part[1:],
+                media_type="application/json"
             )
         else:
             # GCS logging failed, expose error details for debugging
             error_msg = result.get('error', 'Unknown error')
-            print(f"[Feedback] GCS logging failed: {error_msg}")
+            logger.error("GCS logging failed: %s", error_msg)
             raise HTTPException(
                 status_code=500,
                 detail={
@@ -95,10 +109,9 @@ async def submit_feedback(
 
     except Exception as e:
         # Unexpected errors - expose for debugging
+        # (logger.exception captures the traceback lazily, at emit time)
         error_msg = str(e)
-        print(f"[Feedback] Unexpected error: {error_msg}")
-        import traceback
-        traceback.print_exc()  # Print full traceback to logs
+        logger.exception("Unexpected error in feedback endpoint")
         raise HTTPException(
             status_code=500,
             detail={
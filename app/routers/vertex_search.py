@@ -3,19 +3,22 @@ Vertex AI Search Router - Provides /api/vertex-search endpoint
 Supports both streaming (RAG + Gemini) and direct (Vertex summary) modes
 """
 
+import asyncio
+import logging
 import time
 import httpx
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from app.models.vertex_search import (
     VertexSearchRequest,
-    FormattedSearchResponse,
-    FormattedCitation
+    FormattedSearchResponse
 )
 from app.services.vertex_ai_service import VertexAIService
-from app.config import Settings, settings
+from app.config import settings
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # Singleton instance - reuse credentials across requests
@@ -34,18 +37,113 @@ def get_vertex_service() -> VertexAIService:
     global _vertex_service_instance
 
     if _vertex_service_instance is None:
-        print("[Service] Initializing VertexAIService singleton...")
+        logger.info("Initializing VertexAIService singleton...")
         _vertex_service_instance = VertexAIService(
-            gcp_project_id=settings.gcp_project_id,
-            gcp_service_account_key=settings.gcp_service_account_key,
-            vertex_search_engine_id=settings.vertex_search_engine_id,
-            vertex_search_location=settings.vertex_search_location,
-            gemini_api_key=settings.gemini_api_key
+            gcp_project_id=settings.GCP_PROJECT_ID,
+            gcp_service_account_key=settings.GCP_SERVICE_ACCOUNT_KEY,
+            vertex_search_engine_id=settings.VERTEX_SEARCH_ENGINE_ID,
+            vertex_search_location=settings.VERTEX_SEARCH_LOCATION,
+            gemini_api_key=settings.GEMINI_API_KEY,
+            max_qps=settings.VERTEX_MAX_QPS,
+            max_concurrency=settings.VERTEX_MAX_CONCURRENCY
         )
 
     return _vertex_service_instance
 
 
+# SSE comment frame + idle interval for keepalive pings
+_SSE_PING = b": ping\n\n"
+_SSE_PING_INTERVAL = 15.0
+
+# Static headers for the SSE StreamingResponse - built once, reused per request
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # Disable nginx buffering
+    "Access-Control-Allow-Origin": "*",  # CORS header for streaming
+    "Access-Control-Allow-Methods": "POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type"
+}
+
+# Coalescing window: frames arriving within this many seconds of each other
+# are joined into one ASGI send. Caps the extra latency per flush.
+_SSE_FLUSH_WINDOW = 0.01
+_SSE_MAX_BUFFERED_FRAMES = 64
+
+
+async def _with_keepalive(
+    stream,
+    ping_interval: float = _SSE_PING_INTERVAL,
+    flush_window: float = _SSE_FLUSH_WINDOW
+):
+    """
+    Coalesce bursts of SSE frames and insert comment pings while idle
+
+    Gemini often emits many tiny token chunks back to back; sending each
+    as its own ASGI message + socket write is dominated by per-send
+    overhead. Frames that arrive within flush_window of each other are
+    joined into a single write - each frame keeps its own "data:" line,
+    so the client-side SSE parsing is unchanged. When the stream goes
+    quiet with nothing buffered, comment pings stop proxies and load
+    balancers from dropping the connection (e.g. during a slow Gemini
+    first token). The frames are already bytes, so no SSE library or
+    re-framing is involved.
+
+    The inner generator is pumped by a dedicated task into a queue and
+    the timeouts apply to queue.get() - wait_for directly on __anext__
+    would cancel the pending step on every timeout, finalizing the
+    generator and truncating the stream at the first idle gap.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    eof = object()
+
+    async def _pump():
+        try:
+            async for frame in stream:
+                queue.put_nowait(frame)
+        finally:
+            queue.put_nowait(eof)
+
+    pump = asyncio.create_task(_pump())
+    buf = []
+    try:
+        while True:
+            try:
+                frame = await asyncio.wait_for(
+                    queue.get(),
+                    timeout=flush_window if buf else ping_interval
+                )
+            except asyncio.TimeoutError:
+                if buf:
+                    yield b"".join(buf)
+                    buf.clear()
+                else:
+                    yield _SSE_PING
+                continue
+            # Greedily drain whatever the pump has already queued - a
+            # burst coalesces without arming a flush-window timer per frame
+            while True:
+                if frame is eof:
+                    break
+                buf.append(frame)
+                if len(buf) >= _SSE_MAX_BUFFERED_FRAMES:
+                    yield b"".join(buf)
+                    buf.clear()
+                try:
+                    frame = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+            if frame is eof:
+                break
+        if buf:
+            yield b"".join(buf)
+        # The pump holds any upstream exception after eof - surface it
+        await pump
+    finally:
+        if not pump.done():
+            pump.cancel()
+
+
 @router.post("/vertex-search")
 async def vertex_search(
     request: VertexSearchRequest,
@@ -82,7 +180,7 @@ async def vertex_search(
 
             # Stream response using Gemini with generation config
             return StreamingResponse(
-                vertex_service.generate_streaming_response(
+                _with_keepalive(vertex_service.generate_streaming_response(
                     context=context,
                     query=request.query,
                     citations=citations,
@@ -91,55 +189,15 @@ async def vertex_search(
                     top_k=request.topK,
                     top_p=request.topP,
                     max_output_tokens=request.maxOutputTokens
-                ),
+                )),
                 media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "X-Accel-Buffering": "no",  # Disable nginx buffering
-                    "Access-Control-Allow-Origin": "*",  # CORS header for streaming
-                    "Access-Control-Allow-Methods": "POST, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type"
-                }
+                headers=_SSE_HEADERS
             )
 
         else:  # mode == "direct"
             # ===== DIRECT MODE =====
-
-            # Build boost spec if provided
-            boost_spec_dict = None
-            if request.boostSpec:
-                boost_spec_dict = {}
-                if request.boostSpec.conditionBoostSpecs:
-                    boost_spec_dict["conditionBoostSpecs"] = [
-                        {"condition": b.condition, "boost": b.boost}
-                        for b in request.boostSpec.conditionBoostSpecs
-                    ]
-                if request.boostSpec.freshnessBoostSpecs:
-                    boost_spec_dict["freshnessBoostSpecs"] = [
-                        {
-                            "datetimeField": b.datetimeField,
-                            "freshnessDuration": b.freshnessDuration,
-                            "boost": b.boost
-                        }
-                        for b in request.boostSpec.freshnessBoostSpecs
-                    ]
-
-            # Build facet specs if provided
-            facet_specs_list = None
-            if request.facetSpecs:
-                facet_specs_list = [
-                    {
-                        "facetKey": {
-                            "key": f.facetKey.key,
-                            "restrictedValues": f.facetKey.restrictedValues
-                        },
-                        "limit": f.limit,
-                        "excludedFilterKeys": f.excludedFilterKeys,
-                        "enableDynamicPosition": f.enableDynamicPosition
-                    }
-                    for f in request.facetSpecs
-                ]
+            # boostSpec/facetSpecs are TypedDicts already in Vertex API shape,
+            # so they pass straight through without re-packing
 
             result = await vertex_service.search_with_summary(
                 query=request.query,
@@ -148,8 +206,8 @@ async def vertex_search(
                 spell_correction=request.spellCorrection,
                 filter_expr=request.filter,
                 canonical_filter=request.canonicalFilter,
-                boost_spec=boost_spec_dict,
-                facet_specs=facet_specs_list,
+                boost_spec=request.boostSpec,
+                facet_specs=request.facetSpecs,
                 relevance_threshold=request.relevanceThreshold,
                 custom_system_prompt=request.customSystemPrompt,
                 use_semantic_chunks=request.useSemanticChunks,
@@ -162,16 +220,19 @@ async def vertex_search(
 
             response_time = time.time() - start_time
 
-            return FormattedSearchResponse(
-                success=True,
-                mode="direct",
-                query=request.query,
-                summary=result["summary"] or "ไม่พบคำตอบที่เหมาะสมในฐานความรู้",
-                citations=result["citations"],
-                facets=result.get("facets"),
-                totalResults=result["totalResults"],
-                responseTime=round(response_time, 2)
-            )
+            # Trusted data from our own service - serialize straight through
+            # orjson instead of re-validating every citation through Pydantic
+            return ORJSONResponse({
+                "success": True,
+                "mode": "direct",
+                "query": request.query,
+                "summary": result["summary"] or "ไม่พบคำตอบที่เหมาะสมในฐานความรู้",
+                "error": None,
+                "citations": result["citations"],
+                "facets": result.get("facets"),
+                "totalResults": result["totalResults"],
+                "responseTime": round(response_time, 2)
+            })
 
     except ValueError as e:
         # Configuration errors
@@ -0,0 +1,35 @@
+"""
+Shared GCP credential loading for the Vertex AI and GCS services
+Parses the service-account JSON and builds the Credentials object once per key
+"""
+
+from functools import lru_cache
+
+import orjson
+from google.oauth2 import service_account
+
+_SCOPES = ('https://www.googleapis.com/auth/cloud-platform',)
+
+
+@lru_cache(maxsize=4)
+def load_credentials(gcp_service_account_key: str) -> service_account.Credentials:
+    """
+    Parse a service-account JSON string into a Credentials object, cached
+
+    Building Credentials decodes the RSA private key - a few ms of CPU.
+    Both VertexAIService and GCSFeedbackService use the same key, so the
+    lru_cache (keyed on the raw JSON string) does that work once per
+    process instead of once per service.
+
+    Raises:
+        ValueError: if the key is not valid JSON
+    """
+    try:
+        service_account_info = orjson.loads(gcp_service_account_key)
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f"Invalid GCP service account key format: {e}")
+
+    return service_account.Credentials.from_service_account_info(
+        service_account_info,
+        scopes=_SCOPES
+    )
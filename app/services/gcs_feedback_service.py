@@ -5,17 +5,55 @@ Stores feedback as NDJSON (Newline Delimited JSON) with datetime-based filenames
 Structure:
 - chat-feedback/YYYY-MM-DD/positive_YYYYMMDD_HHMMSS_ms.json  (archive, thumbs up)
 - chat-feedback/YYYY-MM-DD/negative_YYYYMMDD_HHMMSS_ms.json  (archive, thumbs down)
-- chat-feedback/latest/positive_YYYYMMDD_HHMMSS_ms.json       (today only, cleared daily)
-- chat-feedback/latest/negative_YYYYMMDD_HHMMSS_ms.json       (today only, cleared daily)
+- chat-feedback/latest/positive_YYYYMMDD_HHMMSS_ms.json       (recent only, expired by lifecycle rule)
+- chat-feedback/latest/negative_YYYYMMDD_HHMMSS_ms.json       (recent only, expired by lifecycle rule)
 """
 
-import json
-from datetime import datetime
-from zoneinfo import ZoneInfo
+import asyncio
+import gzip
+import logging
+import time
 from typing import Optional, Tuple
+import orjson
 from google.cloud import storage
-from google.oauth2 import service_account
 from app.models.feedback import FeedbackRequest
+from app.services.gcp_credentials import load_credentials
+
+logger = logging.getLogger(__name__)
+
+_BANGKOK_UTC_OFFSET_S = 7 * 3600  # fixed offset, no DST
+
+# Server-side replacement for the old Python clear-latest-folder loop:
+# GCS deletes chat-feedback/latest/ objects older than a day on its own
+_LATEST_PREFIX = "chat-feedback/latest/"
+_LATEST_LIFECYCLE_RULE = {
+    "action": {"type": "Delete"},
+    "condition": {"age": 1, "matchesPrefix": [_LATEST_PREFIX]},
+}
+
+
+def _now_bangkok_parts() -> Tuple[time.struct_time, int, str]:
+    """
+    Current Bangkok time as (struct_time, milliseconds, ISO-8601 string)
+
+    time.gmtime is C-implemented and Bangkok is a fixed UTC+7 (no DST), so
+    shifting the epoch replaces a tz-aware datetime construction, and the
+    ISO string is assembled with plain zero-padded f-strings instead of
+    strftime/isoformat.
+    """
+    t = time.time()
+    tm = time.gmtime(t + _BANGKOK_UTC_OFFSET_S)
+    ms = int(t * 1000) % 1000
+    iso = (
+        f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d}"
+        f"T{tm.tm_hour:02d}:{tm.tm_min:02d}:{tm.tm_sec:02d}.{ms:03d}000+07:00"
+    )
+    return tm, ms, iso
+
+
+# Bound in-flight GCS uploads so a burst of feedback can't exhaust the
+# default thread pool that asyncio.to_thread dispatches into
+_UPLOAD_SEMAPHORE = asyncio.Semaphore(32)
 
 
 class GCSFeedbackService:
@@ -25,7 +63,9 @@ class GCSFeedbackService:
         self,
         gcp_service_account_key: str,
         gcp_project_id: str,
-        feedback_bucket_name: str = "9expert-feedback-storage"
+        feedback_bucket_name: str = "9expert-feedback-storage",
+        batch_size: int = 0,
+        flush_interval: float = 5.0
     ):
         """
         Initialize GCS client with service account credentials
@@ -34,19 +74,35 @@ class GCSFeedbackService:
             gcp_service_account_key: JSON string of service account credentials
             gcp_project_id: GCP project ID
             feedback_bucket_name: GCS bucket name for feedback storage
+            batch_size: events per NDJSON batch object; 0 writes one object
+                per event (classic behavior)
+            flush_interval: max seconds before a partial batch is flushed
         """
         self.gcp_project_id = gcp_project_id
         self.feedback_bucket_name = feedback_bucket_name
-
-        # Parse service account credentials
-        try:
-            service_account_info = json.loads(gcp_service_account_key)
-            self.credentials = service_account.Credentials.from_service_account_info(
-                service_account_info,
-                scopes=['https://www.googleapis.com/auth/cloud-platform']
-            )
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid GCP service account key format: {e}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # Batch mode state - queue/flusher are created lazily on first use
+        # because they need a running event loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # Memo of whether the latest/ lifecycle rule is known to be in
+        # place - after the first successful check no request touches
+        # bucket metadata again for the life of the process. The patch
+        # needs storage.buckets.get/update; if the service account lacks
+        # them the first failure flips _lifecycle_unavailable and we fall
+        # back to the per-day clear loop (object permissions only)
+        # instead of repeating a failing metadata round trip per request
+        self._lifecycle_ok = False
+        self._lifecycle_unavailable = False
+        self._last_cleared_date: Optional[str] = None
+        self._lifecycle_lock = asyncio.Lock()
+
+        # Parse service account credentials (shared, cached per key - the
+        # Vertex service parses the same JSON, so this is a cache hit)
+        self.credentials = load_credentials(gcp_service_account_key)
 
         # Initialize GCS client
         self.storage_client = storage.Client(
@@ -54,42 +110,101 @@ class GCSFeedbackService:
             credentials=self.credentials
         )
 
-    def _get_bucket(self) -> storage.Bucket:
-        """
-        Get bucket reference (no API call, just returns bucket object)
+        # Cached bucket reference - bucket() makes no API call (and doesn't
+        # verify existence), so one handle built here serves every request
+        # instead of re-allocating a Bucket object per upload
+        self._bucket = self.storage_client.bucket(self.feedback_bucket_name)
 
-        Returns:
-            GCS Bucket object (lightweight reference, doesn't verify existence)
+    async def _ensure_latest_cleanup(self) -> None:
+        """
+        Make sure old chat-feedback/latest/ objects get expired
+
+        Preferred path: one idempotent lifecycle-rule patch per process,
+        after which GCS deletes latest/ objects older than one day on its
+        own with no application code on the hot path. The patch needs
+        storage.buckets.get/update, which the deployment may not grant -
+        the patch is attempted exactly once, and on failure every later
+        call goes straight to the old per-day clear loop, which only
+        needs object permissions.
         """
-        # Use bucket() instead of get_bucket() to avoid storage.buckets.get permission
-        # This creates a bucket reference without making an API call
-        bucket = self.storage_client.bucket(self.feedback_bucket_name)
-        return bucket
+        if self._lifecycle_ok:
+            return
 
-    def _get_current_date(self) -> str:
+        if not self._lifecycle_unavailable:
+            async with self._lifecycle_lock:
+                # Re-check under the lock - another request may have just run it
+                if self._lifecycle_ok:
+                    return
+                if not self._lifecycle_unavailable:
+                    if await asyncio.to_thread(self._ensure_latest_lifecycle_rule_sync):
+                        self._lifecycle_ok = True
+                        return
+                    self._lifecycle_unavailable = True
+                    logger.warning(
+                        "Lifecycle patch unavailable (missing storage.buckets.get/update?); "
+                        "falling back to the per-day latest/ clear loop"
+                    )
+
+        await self._check_and_clear_latest_folder()
+
+    def _ensure_latest_lifecycle_rule_sync(self) -> bool:
         """
-        Get current date in Bangkok timezone (UTC+7) for folder naming
+        Blocking lifecycle-patch attempt (thread-pool only)
 
         Returns:
-            Date string in format YYYY-MM-DD
+            True if the rule is known present (already set or just added),
+            False on error
+        """
+        try:
+            bucket = self.storage_client.get_bucket(self.feedback_bucket_name)
+            rules = list(bucket.lifecycle_rules)
+
+            for rule in rules:
+                condition = rule.get("condition", {})
+                if _LATEST_PREFIX in condition.get("matchesPrefix", []):
+                    return True
+
+            rules.append(_LATEST_LIFECYCLE_RULE)
+            bucket.lifecycle_rules = rules
+            bucket.patch()
+            logger.info("Added lifecycle rule: delete %s* after 1 day", _LATEST_PREFIX)
+            return True
+
+        except Exception as e:
+            # Don't fail feedback submission if the metadata patch fails
+            logger.warning("Failed to ensure latest/ lifecycle rule: %s", e)
+            return False
+
+    async def _check_and_clear_latest_folder(self) -> None:
         """
-        bangkok_tz = ZoneInfo("Asia/Bangkok")
-        return datetime.now(bangkok_tz).strftime("%Y-%m-%d")
+        Fallback: clear latest/ once per Bangkok day via list + delete
 
-    def _check_and_clear_latest_folder(self, current_date: str) -> None:
+        Memoized on the current date, so past the first request of the
+        day this is a plain string compare with no GCS traffic.
         """
-        Check if it's a new day and clear the latest/ folder if needed
+        tm, _, _ = _now_bangkok_parts()
+        current_date = f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d}"
 
-        Strategy:
-        - Store last_cleared_date in a marker file: chat-feedback/latest/.last_cleared
-        - If current date != last_cleared_date, delete all files in latest/ and update marker
+        if self._last_cleared_date == current_date:
+            return
 
-        Args:
-            current_date: Current date in YYYY-MM-DD format
+        async with self._lifecycle_lock:
+            # Re-check under the lock - another request may have just cleared
+            if self._last_cleared_date == current_date:
+                return
+            if await asyncio.to_thread(self._clear_latest_folder_sync, current_date):
+                self._last_cleared_date = current_date
+
+    def _clear_latest_folder_sync(self, current_date: str) -> bool:
+        """
+        Blocking body of _check_and_clear_latest_folder (thread-pool only)
+
+        Returns:
+            True if latest/ is known clear for current_date, False on error
         """
         try:
-            bucket = self._get_bucket()
-            marker_blob = bucket.blob("chat-feedback/latest/.last_cleared")
+            bucket = self._bucket
+            marker_blob = bucket.blob(f"{_LATEST_PREFIX}.last_cleared")
 
             # Check if marker exists and get last cleared date
             if marker_blob.exists():
@@ -97,12 +212,10 @@ class GCSFeedbackService:
 
                 if last_cleared == current_date:
                     # Already cleared today, no action needed
-                    return
+                    return True
 
             # New day - clear all feedback files in latest/
-            print(f"[GCS] New day detected ({current_date}), clearing chat-feedback/latest/ folder...")
-
-            blobs = bucket.list_blobs(prefix="chat-feedback/latest/")
+            blobs = bucket.list_blobs(prefix=_LATEST_PREFIX)
             deleted_count = 0
 
             for blob in blobs:
@@ -114,22 +227,28 @@ class GCSFeedbackService:
             # Update marker file with current date
             marker_blob.upload_from_string(current_date, content_type="text/plain")
 
-            print(f"[GCS] Cleared {deleted_count} files from chat-feedback/latest/")
+            logger.info("Cleared %d files from %s", deleted_count, _LATEST_PREFIX)
+            return True
 
         except Exception as e:
             # Don't fail feedback submission if cleanup fails
-            print(f"[GCS] Warning: Failed to clear latest folder: {e}")
+            logger.warning("Failed to clear latest folder: %s", e)
+            return False
 
-    def _generate_feedback_paths(self, timestamp_iso: str, feedback_type: str) -> Tuple[str, str, str]:
+    def _generate_feedback_paths(self, tm: time.struct_time, milliseconds: int, feedback_type: str) -> Tuple[str, str, str]:
         """
         Generate both archive and latest paths for feedback with sentiment prefix
 
+        Built from an already-computed Bangkok struct_time with zero-padded
+        f-strings - no datetime construction or strftime on the hot path.
+
         Format:
         - Archive: chat-feedback/YYYY-MM-DD/positive_YYYYMMDD_HHMMSS_milliseconds.json
         - Latest: chat-feedback/latest/positive_YYYYMMDD_HHMMSS_milliseconds.json
 
         Args:
-            timestamp_iso: ISO 8601 timestamp string
+            tm: Bangkok-local struct_time (from _now_bangkok_parts)
+            milliseconds: millisecond component (0-999)
             feedback_type: "up" or "down"
 
         Returns:
@@ -139,37 +258,158 @@ class GCSFeedbackService:
                  "chat-feedback/2025-01-22/negative_20250122_143025_456.json",
                  "chat-feedback/latest/negative_20250122_143025_456.json")
         """
-        try:
-            dt = datetime.fromisoformat(timestamp_iso.replace('Z', '+00:00'))
-            # Date folder: YYYY-MM-DD
-            date_folder = dt.strftime("%Y-%m-%d")
-            # Filename prefix based on feedback type
-            prefix = "positive" if feedback_type == "up" else "negative"
-            # Timestamp: YYYYMMDD_HHMMSS_milliseconds
-            time_part = dt.strftime("%Y%m%d_%H%M%S")
-            milliseconds = dt.microsecond // 1000
-            filename = f"{prefix}_{time_part}_{milliseconds:03d}.json"
+        date_folder = f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d}"
+        prefix = "positive" if feedback_type == "up" else "negative"
+        filename = (
+            f"{prefix}_{tm.tm_year:04d}{tm.tm_mon:02d}{tm.tm_mday:02d}"
+            f"_{tm.tm_hour:02d}{tm.tm_min:02d}{tm.tm_sec:02d}_{milliseconds:03d}.json"
+        )
 
-            archive_path = f"chat-feedback/{date_folder}/{filename}"
-            latest_path = f"chat-feedback/latest/{filename}"
+        archive_path = f"chat-feedback/{date_folder}/{filename}"
+        latest_path = f"chat-feedback/latest/{filename}"
 
-            return date_folder, archive_path, latest_path
+        return date_folder, archive_path, latest_path
 
-        except Exception as e:
-            # Fallback: use current Bangkok time if parsing fails
-            print(f"[GCS] Warning: Failed to parse timestamp '{timestamp_iso}', using current time: {e}")
-            bangkok_tz = ZoneInfo("Asia/Bangkok")
-            now = datetime.now(bangkok_tz)
-            date_folder = now.strftime("%Y-%m-%d")
-            prefix = "positive" if feedback_type == "up" else "negative"
-            time_part = now.strftime("%Y%m%d_%H%M%S")
-            milliseconds = now.microsecond // 1000
-            filename = f"{prefix}_{time_part}_{milliseconds:03d}.json"
+    async def _enqueue_feedback(self, feedback: FeedbackRequest) -> dict:
+        """
+        Queue feedback for batched upload (batch mode only)
 
-            archive_path = f"chat-feedback/{date_folder}/{filename}"
-            latest_path = f"chat-feedback/latest/{filename}"
+        Returns immediately; the background flusher groups queued events
+        into one NDJSON object per (sentiment, day) instead of two GCS
+        PUTs per event, cutting GCS operations by the batch factor under
+        burst load.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+        _, _, created_at = _now_bangkok_parts()
+
+        feedback_data = {
+            "messageId": feedback.messageId,
+            "feedback": feedback.feedback,
+            "reason": feedback.reason,
+            "userQuestion": feedback.userQuestion,
+            "aiAnswer": feedback.aiAnswer,
+            "createdAt": created_at
+        }
+        await self._queue.put(feedback_data)
+
+        return {
+            "success": True,
+            # The batch object name isn't known yet - identify the event
+            "feedbackId": f"batched/{feedback.messageId}",
+            "storedAt": created_at,
+            "error": None
+        }
+
+    async def _flush_loop(self) -> None:
+        """Drain the queue and upload one NDJSON object per batch"""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Block for the first event, then fill the batch until either
+            # batch_size events or flush_interval seconds, whichever first
+            batch = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Batch mode bypasses log_feedback's per-request path, so
+                # the latest/ expiry setup has to happen here - memoized,
+                # so it's a no-op after the first batch (or a date compare
+                # on the clear-loop fallback)
+                await self._ensure_latest_cleanup()
+            except asyncio.CancelledError:
+                # Shutdown landed between draining and uploading - hand
+                # the events back so aclose() flushes them
+                for item in batch:
+                    self._queue.put_nowait(item)
+                raise
+
+            try:
+                await asyncio.to_thread(self._upload_batch_sync, batch)
+            except asyncio.CancelledError:
+                # The worker thread finishes this upload on its own -
+                # don't re-queue, or aclose() would write it twice
+                raise
+            except Exception as e:
+                logger.warning("Failed to upload feedback batch (%d events): %s", len(batch), e)
+
+    async def aclose(self) -> None:
+        """
+        Flush queued feedback and stop the background flusher
 
-            return date_folder, archive_path, latest_path
+        Batch mode acks success at enqueue time, so a graceful shutdown
+        (e.g. a Cloud Run SIGTERM on scale-down) must upload whatever is
+        still queued before the process exits. No-op outside batch mode.
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+        if self._queue is None or self._queue.empty():
+            return
+
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        try:
+            await asyncio.to_thread(self._upload_batch_sync, batch)
+            logger.info("Flushed %d queued feedback events at shutdown", len(batch))
+        except Exception as e:
+            # Already acked to clients - losing these is worth an error log
+            logger.error("Dropped %d feedback events at shutdown: %s", len(batch), e)
+
+    def _upload_batch_sync(self, batch: list) -> None:
+        """Upload a drained batch as NDJSON objects, grouped by sentiment and date"""
+        bucket = self._bucket
+
+        groups: dict = {}
+        for item in batch:
+            prefix = "positive" if item["feedback"] == "up" else "negative"
+            date_folder = item["createdAt"][:10]  # YYYY-MM-DD
+            groups.setdefault((date_folder, prefix), []).append(item)
+
+        tm, milliseconds, _ = _now_bangkok_parts()
+        time_part = (
+            f"{tm.tm_year:04d}{tm.tm_mon:02d}{tm.tm_mday:02d}"
+            f"_{tm.tm_hour:02d}{tm.tm_min:02d}{tm.tm_sec:02d}"
+        )
+
+        for (date_folder, prefix), items in groups.items():
+            ndjson_bytes = b"\n".join(orjson.dumps(item) for item in items)
+            # NDJSON (repeated keys + Thai prose) compresses ~5-10x; level 1
+            # keeps the CPU cost small. GCS serves it back decompressed via
+            # the gzip Content-Encoding (decompressive transcoding on GET)
+            gzipped = gzip.compress(ndjson_bytes, compresslevel=1)
+            filename = f"batch_{prefix}_{time_part}_{milliseconds:03d}.json"
+            for path in (
+                f"chat-feedback/{date_folder}/{filename}",
+                f"chat-feedback/latest/{filename}",
+            ):
+                # checksum=None skips client-side MD5 hashing of the
+                # payload; if_generation_match=0 makes the upload an atomic
+                # create (names are millisecond-unique, so it never trips)
+                # and lets the client retry it safely
+                blob = bucket.blob(path)
+                blob.content_encoding = "gzip"
+                blob.upload_from_string(
+                    gzipped,
+                    content_type="application/x-ndjson",
+                    checksum=None,
+                    if_generation_match=0
+                )
 
     async def log_feedback(self, feedback: FeedbackRequest) -> dict:
         """
@@ -177,7 +417,7 @@ class GCSFeedbackService:
 
         Writes to:
         1. chat-feedback/YYYY-MM-DD/{positive|negative}_xxx.json (permanent archive)
-        2. chat-feedback/latest/{positive|negative}_xxx.json (today's data, cleared daily)
+        2. chat-feedback/latest/{positive|negative}_xxx.json (recent data, expired by lifecycle rule)
 
         Args:
             feedback: FeedbackRequest object with user feedback data
@@ -189,21 +429,25 @@ class GCSFeedbackService:
                 - storedAt: str (ISO timestamp)
                 - error: Optional[str]
         """
+        # Batch mode: enqueue and let the background flusher upload
+        if self.batch_size > 0:
+            return await self._enqueue_feedback(feedback)
+
         try:
-            # Get bucket (assumes bucket already exists)
-            bucket = self._get_bucket()
+            # Cached bucket handle (assumes bucket already exists)
+            bucket = self._bucket
 
             # Generate server timestamp in Bangkok timezone (UTC+7)
-            bangkok_tz = ZoneInfo("Asia/Bangkok")
-            created_at = datetime.now(bangkok_tz).isoformat()
+            tm, milliseconds, created_at = _now_bangkok_parts()
 
-            # Get current date and check if we need to clear latest folder
-            current_date = self._get_current_date()
-            self._check_and_clear_latest_folder(current_date)
+            # Make sure old latest/ objects get expired (lifecycle rule,
+            # or the per-day clear fallback if the patch isn't permitted)
+            await self._ensure_latest_cleanup()
 
             # Generate paths for both locations (with positive/negative prefix)
             date_folder, archive_path, latest_path = self._generate_feedback_paths(
-                created_at,
+                tm,
+                milliseconds,
                 feedback.feedback
             )
 
@@ -217,27 +461,42 @@ class GCSFeedbackService:
                 "createdAt": created_at
             }
 
-            # Convert to NDJSON (single line JSON)
-            ndjson_content = json.dumps(feedback_data, ensure_ascii=False)
+            # Convert to NDJSON (single line JSON) - orjson emits UTF-8
+            # bytes directly (no ensure_ascii escaping, no .encode())
+            ndjson_bytes = orjson.dumps(feedback_data)
 
-            # Upload to BOTH locations
-            # 1. Archive (permanent, organized by date)
-            archive_blob = bucket.blob(archive_path)
-            archive_blob.upload_from_string(
-                ndjson_content,
-                content_type="application/x-ndjson"
-            )
+            # Upload gzipped - the NDJSON compresses ~5-10x and GCS serves
+            # it back decompressed (gzip Content-Encoding transcoding on GET)
+            gzipped = gzip.compress(ndjson_bytes, compresslevel=1)
 
-            # 2. Latest (today's data only, for easy consumption)
-            latest_blob = bucket.blob(latest_path)
-            latest_blob.upload_from_string(
-                ndjson_content,
-                content_type="application/x-ndjson"
-            )
-
-            print(f"[GCS] Feedback logged successfully:")
-            print(f"  - Archive: {archive_path}")
-            print(f"  - Latest: {latest_path}")
+            # Write to BOTH locations, off the event loop (the storage
+            # client is synchronous, so each call runs in a worker thread)
+            archive_blob = bucket.blob(archive_path)
+            archive_blob.content_encoding = "gzip"
+
+            async with _UPLOAD_SEMAPHORE:
+                # 1. Archive (permanent, organized by date) - the only call
+                #    that transmits the payload bytes
+                # checksum=None skips client-side MD5 hashing;
+                # if_generation_match=0 is an atomic create-only precondition
+                # (names are millisecond-unique) that also makes the upload
+                # safely retryable
+                await asyncio.to_thread(
+                    archive_blob.upload_from_string,
+                    gzipped,
+                    content_type="application/x-ndjson",
+                    checksum=None,
+                    if_generation_match=0
+                )
+
+                # 2. Latest (recent data only) - server-side copy of the
+                #    archive object; metadata-only, no second upload
+                await asyncio.to_thread(
+                    bucket.copy_blob, archive_blob, bucket, latest_path
+                )
+
+            # %-style args: nothing is formatted unless the level is enabled
+            logger.debug("Feedback logged: archive=%s latest=%s", archive_path, latest_path)
 
             return {
                 "success": True,
@@ -248,7 +507,7 @@ class GCSFeedbackService:
 
         except Exception as e:
             error_msg = f"Failed to log feedback to GCS: {str(e)}"
-            print(f"[GCS] Error: {error_msg}")
+            logger.error("%s", error_msg)
             return {
                 "success": False,
                 "feedbackId": None,